@@ -4,7 +4,7 @@ import cv2
 from enum import Enum
 import base64
 from tensorflow_serving.apis import predict_pb2
-from tensorflow.python.framework import tensor_util
+from tensorflow.core.framework import types_pb2
 
 
 class ObjectDetector:
@@ -19,11 +19,12 @@ class ObjectDetector:
         Output(Enum): enum de opções de output
         Infos(Enum): enum de informações importantes
         outputs_functions: mapeamento dos outputs com as funções
-        label_map: mapeamento de rótulos no formato protobuf
+        label_map: mapeamento de rótulos indexado pelo id (LabelMap)
         show_confidence: bool indicativo se deve ser exibido a confiança (somente para o output VIS_OBJECTS)
         images_original: lista de imagens enviadas para inferência sem alteração
         stub: conexão para requisições gRPC
         image_processor: objeto que faz o processamento de imagens
+        process_pool: pool de processos para decodificação e codificação das imagens (opcional)
 
     """
 
@@ -38,7 +39,7 @@ class ObjectDetector:
         INFO_NMS_THRESHOLD = "non_maximum_suppression_threshold"
         INFO_SHOW_CONFIDENCE = "show_confidence"
 
-    def __init__(self, stub, image_processor, label_map=None):
+    def __init__(self, stub, image_processor, label_map=None, process_pool=None):
         # define o mapeamento de outputs e funções
         self.outputs_functions = {
             self.Output.OUTPUT_BOXES: self._build_output_boxes,
@@ -59,6 +60,9 @@ class ObjectDetector:
         # armazena o objeto de processamento de imagens
         self.image_processor = image_processor
 
+        # armazena o pool de processos. Se não for informado, as imagens são processadas no próprio processo
+        self.process_pool = process_pool
+
     def request_grpc(self, images_bytes):
         """ Requisição gRPC
 
@@ -73,9 +77,13 @@ class ObjectDetector:
         predict_request = predict_pb2.PredictRequest()
         predict_request.model_spec.name = "detector_placa_veiculos" #TODO passar como parâmetro
         predict_request.model_spec.signature_name = "serving_default"
-        predict_request.inputs["input_tensor"].CopyFrom(
-            tensor_util.make_tensor_proto(images_bytes, tf.string)
-        )
+
+        # o tensor de entrada é montado direto na requisição. Os bytes das imagens são copiados uma única vez para o
+        # protobuf, sem passar por um array numpy intermediário e sem o CopyFrom de um tensor montado separadamente
+        input_tensor = predict_request.inputs["input_tensor"]
+        input_tensor.dtype = types_pb2.DT_STRING
+        input_tensor.tensor_shape.dim.add(size=len(images_bytes))
+        input_tensor.string_val.extend(images_bytes)
 
         predict_response = self.stub.Predict(predict_request, 60)
 
@@ -116,7 +124,7 @@ class ObjectDetector:
 
         return list_detections
 
-    def predict(self, images, output, vars_output):
+    async def predict(self, images, output, vars_output):
         """Predição na imagem conforme o output
 
         Args:
@@ -144,75 +152,83 @@ class ObjectDetector:
             self.Infos.INFO_SHOW_CONFIDENCE.value, False
         )
 
-        # decodifica as imagens para ser utilizado posteriormente
-        self.images_original = [
-            self.image_processor.decode_image(image) for image in images
-        ]
+        # decodifica as imagens (BGR) para ser utilizado posteriormente
+        self.images_original = await self.image_processor.decode_images(
+            images, process_pool=self.process_pool
+        )
 
-        # inferência
-        detections_por_imagem = self.request_grpc(images)
+        try:
+            # inferência
+            detections_por_imagem = self.request_grpc(images)
 
-        # inicializa a lista de resultados das imagens
-        results_info = []
+            # inicializa a lista de resultados das imagens
+            results_info = []
 
-        # percorre as detecções de cada imagem
-        for detections in detections_por_imagem:
+            # percorre as detecções de cada imagem
+            for detections in detections_por_imagem:
 
-            # Coleta a quantidade de objetos detectados
-            num_detections = int(detections.pop("num_detections"))
+                # Coleta a quantidade de objetos detectados
+                num_detections = int(detections.pop("num_detections"))
 
-            # verifica se houve alguma detecção para proceder com as operações necessárias
-            if num_detections == 0:
-                results_info.append([])
-            else:
-                # Define o que é necessário para construir o output
-                key_of_interest = [
-                    "detection_classes",
-                    "detection_boxes",
-                    "detection_scores",
-                ]
-
-                # coletando as informações de interesse e eliminando os valores que não são detecções, utilizando o
-                # número de detecções para fazer o recorte na lista
-                detections = {
-                    key: np.array(value[0:num_detections])
-                    for key, value in detections.items()
-                    if key in key_of_interest
-                }
-
-                # As classes detectadas devem ser inteiros
-                detections["detection_classes"] = detections[
-                    "detection_classes"
-                ].astype(np.int64)
-
-                # filtrando as detecções pelo threshold da confiança da predição
-                for key in key_of_interest:
-                    scores = detections["detection_scores"]
-                    current_array = detections[key]
-                    filtered_current_array = current_array[
-                        scores > confidence_threshold
+                # verifica se houve alguma detecção para proceder com as operações necessárias
+                if num_detections == 0:
+                    results_info.append([])
+                else:
+                    # Define o que é necessário para construir o output
+                    key_of_interest = [
+                        "detection_classes",
+                        "detection_boxes",
+                        "detection_scores",
                     ]
-                    detections[key] = filtered_current_array
-
-                # retira as detecções que se sobrescrevem conforme o treshold definido
-                boxes, scores, classes = self._nms(
-                    detections["detection_boxes"],
-                    detections["detection_scores"],
-                    detections["detection_classes"],
-                    non_maximum_suppression_threshold,
-                )
-
-                # agrupa as informações das detecções e ordena pelos de maior confiança
-                result_info = list(zip(boxes, scores, classes))
-                result_info.sort(key=lambda x: x[1], reverse=True)
-
-                # restringe as detecções pela quantidade máxima de objetos definida nas configurações
-                results_info.append(result_info[:max_objects])
 
-        # chama a função correspondente ao output, passando as detecções
-        return output_function(results_info)
+                    # coletando as informações de interesse e eliminando os valores que não são detecções, utilizando o
+                    # número de detecções para fazer o recorte na lista
+                    detections = {
+                        key: np.array(value[0:num_detections])
+                        for key, value in detections.items()
+                        if key in key_of_interest
+                    }
+
+                    # As classes detectadas devem ser inteiros
+                    detections["detection_classes"] = detections[
+                        "detection_classes"
+                    ].astype(np.int64)
+
+                    # filtrando as detecções pelo threshold da confiança da predição
+                    for key in key_of_interest:
+                        scores = detections["detection_scores"]
+                        current_array = detections[key]
+                        filtered_current_array = current_array[
+                            scores > confidence_threshold
+                        ]
+                        detections[key] = filtered_current_array
+
+                    # retira as detecções que se sobrescrevem conforme o treshold definido
+                    boxes, scores, classes = self._nms(
+                        detections["detection_boxes"],
+                        detections["detection_scores"],
+                        detections["detection_classes"],
+                        non_maximum_suppression_threshold,
+                    )
+
+                    # agrupa as informações das detecções e ordena pelos de maior confiança
+                    result_info = list(zip(boxes, scores, classes))
+                    result_info.sort(key=lambda x: x[1], reverse=True)
+
+                    # restringe as detecções pela quantidade máxima de objetos definida nas configurações
+                    results_info.append(result_info[:max_objects])
+
+            # chama a função correspondente ao output, passando as detecções
+            return await output_function(results_info)
+        finally:
+            # as imagens decodificadas são liberadas ao fim da requisição, inclusive quando a inferência ou o
+            # pós-processamento falham
+            self.image_processor.release_images(
+                self.images_original, process_pool=self.process_pool
+            )
+            self.images_original = None
 
-    def _build_output_crops(self, results_info):
+    async def _build_output_crops(self, results_info):
         """Recorta o objeto da imagem original
 
         Args:
@@ -237,22 +253,20 @@ class ObjectDetector:
                 # calcula as coordenadas em valores absolutos
                 boxes = self._calcule_coord(image, list(info[0]))
 
-                # recorta o objeto da imagem original
-                roi = image[boxes[0] : boxes[2], boxes[1] : boxes[3]]
-
-                # codifica o recorte em imagem jpg. É necessário converter a ordem dos canais de cores devido ao padrão
-                # do opencv
-                _, roi = cv2.imencode(".jpg", cv2.cvtColor(roi, cv2.COLOR_RGB2BGR))
+                # recorta o objeto da imagem original. O recorte é uma visão da imagem, sem cópia
+                list_roi.append(image[boxes[0] : boxes[2], boxes[1] : boxes[3]])
 
-                # converte em binário e armazena na lista de recortes (roi)
-                list_roi.append(base64.b64encode(roi))
+            # codifica os recortes em imagem jpg
+            list_roi = await self.image_processor.encode_images(
+                list_roi, process_pool=self.process_pool
+            )
 
-            # armazena na lista de recortes por imagem
-            crops.append(list_roi)
+            # converte em binário e armazena na lista de recortes por imagem
+            crops.append([base64.b64encode(roi) for roi in list_roi])
 
         return crops
 
-    def _build_output_vis(self, results_info):
+    async def _build_output_vis(self, results_info):
         """Inclui a anotação dos objetos na imagem original
 
         Args:
@@ -265,15 +279,14 @@ class ObjectDetector:
         # na visualização somente uma imagem é enviada, portando será sempre o primeiro da lista
         result_info = results_info[0]
 
-        # faz uma cópia da imagem original, evitando alterá-la
+        # as anotações são desenhadas direto na imagem original, sem cópia, pois ela não é utilizada depois
         image_with_objects = self.images_original[0]
 
-        # atualiza a imagem com objetos para cada objeto detectado
-        for info in result_info:
+        # coleta os nomes dos rótulos de todos os objetos utilizando os ids detectados no mapeamento de rótulos
+        labels_class = self.label_map.names([info[2] for info in result_info])
 
-            # coleta o nome do rótulo utilizando o id detectado no mapeamento de rótulos
-            class_id = info[2]
-            label_class = self.label_map.get(class_id, class_id)
+        # atualiza a imagem com objetos para cada objeto detectado
+        for info, label_class in zip(result_info, labels_class):
 
             # calcula as coordenadas em valores absolutos e desenha um retângulo na imagem com objetos
             boxes = self._calcule_coord(image_with_objects, list(info[0]))
@@ -281,7 +294,7 @@ class ObjectDetector:
                 image_with_objects,
                 (boxes[1], boxes[0]),
                 (boxes[3], boxes[2]),
-                (255, 0, 0),
+                (0, 0, 255),
                 2,
             )
 
@@ -298,18 +311,20 @@ class ObjectDetector:
                 (boxes[1], boxes[0] - 15),
                 cv2.FONT_HERSHEY_SIMPLEX,
                 0.75,
-                (255, 0, 0),
+                (0, 0, 255),
                 2,
             )
 
-        # codifica a imagem jpg. É necessário converter a ordem dos canais de cores devido ao padrão do opencv
-        _, image_with_objects = cv2.imencode(
-            ".jpg", cv2.cvtColor(image_with_objects, cv2.COLOR_RGB2BGR)
-        )
+        # codifica a imagem jpg. A imagem já está na ordem de canais do opencv (BGR)
+        image_with_objects = (
+            await self.image_processor.encode_images(
+                [image_with_objects], process_pool=self.process_pool
+            )
+        )[0]
 
         return image_with_objects
 
-    def _build_output_boxes(self, results_info):
+    async def _build_output_boxes(self, results_info):
         """Lista as coordenadas dos objetos detectados
 
         Args:
@@ -328,12 +343,11 @@ class ObjectDetector:
             # inicializa a lista de coordenadas da imagem atual
             output_image = []
 
-            # percorre a lista de objetos detectados da imagem
-            for info in result_info:
-                # coleta o nome do rótulo utilizando o id detectado no mapeamento de rótulos
-                class_id = info[2]
-                label_class = self.label_map.get(class_id, class_id)
+            # coleta os nomes dos rótulos de todos os objetos utilizando os ids detectados no mapeamento de rótulos
+            labels_class = self.label_map.names([info[2] for info in result_info])
 
+            # percorre a lista de objetos detectados da imagem
+            for info, label_class in zip(result_info, labels_class):
                 # constrói o dicionário para ser incluído na lista de coordenadas
                 object_detected = {
                     # formato: [ymin, xmin, ymax, xmax]
@@ -1,4 +1,5 @@
-import tensorflow as tf
+import cv2
+import numpy as np
 from fastapi import HTTPException
 import filetype
 
@@ -6,7 +7,7 @@ import filetype
 class ImageProcessor:
     """Classe que processa as imagens.
 
-      Lê e decodifica imagens
+      Lê, decodifica e codifica imagens
 
     """
 
@@ -46,5 +47,43 @@ class ImageProcessor:
 
     @staticmethod
     def decode_image(input_image):
-        # decodifica usando o Tensorflow e retorna como array numpy
-        return tf.image.decode_jpeg(input_image, channels=3).numpy()
+        # decodifica usando o opencv direto na ordem de canais BGR. O np.frombuffer apenas cria uma visão dos bytes,
+        # sem copiá-los. A orientação do EXIF é ignorada, como faz o TF Serving, para que as coordenadas detectadas
+        # correspondam à imagem decodificada
+        image = cv2.imdecode(
+            np.frombuffer(input_image, np.uint8),
+            cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION,
+        )
+
+        if image is None:
+            raise HTTPException(status_code=415, detail="Não foi possível decodificar a imagem")
+
+        return image
+
+    @staticmethod
+    async def decode_images(input_images, process_pool=None):
+        # sem pool de processos, decodifica no próprio processo
+        if process_pool is None:
+            return [ImageProcessor.decode_image(input_image) for input_image in input_images]
+
+        # com pool de processos, as imagens são decodificadas em paralelo e o event loop fica livre para as outras
+        # requisições enquanto isso
+        try:
+            return await process_pool.decode(input_images)
+        except ValueError:
+            raise HTTPException(status_code=415, detail="Não foi possível decodificar a imagem")
+
+    @staticmethod
+    def release_images(images, process_pool=None):
+        # as imagens decodificadas pelo pool de processos estão em memória compartilhada, liberada quando não houver
+        # mais referências para elas
+        if process_pool is not None:
+            process_pool.release(images)
+
+    @staticmethod
+    async def encode_images(images, process_pool=None, extension=".jpg"):
+        # as imagens devem estar na ordem de canais do opencv (BGR)
+        if process_pool is None:
+            return [cv2.imencode(extension, image)[1] for image in images]
+
+        return await process_pool.encode(images, extension)
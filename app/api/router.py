@@ -12,42 +12,99 @@ import io
 from typing import List
 import grpc
 from tensorflow_serving.apis import prediction_service_pb2_grpc
-import json
 import os
+import signal
+import threading
 
 # importa os módulos próprios necessários
 from .imageprocessor import ImageProcessor
 from .estimators.objectdetector import ObjectDetector as Estimator
-import utils.read_label_map as read_label_map
+from utils.config_store import ConfigStore
+from utils.process_pool import SharedMemoryPool
 
 # módulo que lida com as diversas operações do endpoint
 router = APIRouter()
 
-# carrega os arquivos de configurações
-config_model = json.load(open(os.environ.get("config_model")))
-config_output = json.load(open(os.environ.get("config_output")))
-config_api = json.load(open(os.environ.get("config_api")))
+# carrega os arquivos de configurações e o label map. Eles são recarregados quando os arquivos mudam ou quando o
+# processo recebe o sinal SIGHUP
+config_store = ConfigStore(
+    os.environ.get("config_model"),
+    os.environ.get("config_output"),
+    os.environ.get("config_api"),
+)
 
-# transforma o label map em um dicionário
-label_map = read_label_map.read_label_map(config_model["LABEL_MAP_PATH"])
+# as configurações do servidor só são lidas ao iniciar a API
+config_server = config_store.get().config_api.get("SERVER", {})
+config_store.check_interval = config_server.get("CONFIG_RELOAD_INTERVAL", 5)
 
-# define variáveis para a chamada gRPC que será feita para o TF Serving
-options = [
-    (
-        "grpc.max_receive_message_length",
-        config_model["GRPC_MAX_RECEIVE_MESSAGE_LENGTH"],
-    ),
-    ("grpc_max_send_message_length", config_model["GRPC_MAX_SEND_MESSAGE_LENGTH"]),
-]
+# quantidade de processos do pool de decodificação e codificação de imagens. Com 0 o pool não é utilizado
+process_pool_workers = config_server.get("PROCESS_POOL_WORKERS", 0)
 
-channel = grpc.insecure_channel(config_model["MODEL_URL_GRPC"], options=options)
+# o handler só pode ser registrado na thread principal. Com vários workers, o supervisor (serve.py) inicia os workers
+# com o SIGHUP bloqueado; o sinal é desbloqueado somente depois que o handler está registrado
+if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGHUP, lambda signum, frame: config_store.request_reload())
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGHUP})
 
-stub = prediction_service_pb2_grpc.PredictionServiceStub(channel)
+# o canal gRPC e o pool de processos são criados sob demanda em cada processo. Com vários workers, cada worker cria
+# os seus no primeiro uso, sem herdar os do processo pai
+_process_resources = {"pid": None, "grpc_config": None, "stub": None, "process_pool": None}
+
+
+def get_process_resources(config_model):
+    """Recupera o stub gRPC e o pool de processos do processo atual
+
+    O canal gRPC é recriado se as configurações de conexão com o modelo mudarem. As requisições em andamento continuam
+    utilizando o canal anterior
+
+    Args:
+        config_model: configurações do modelo
+
+    Returns:
+        Uma tupla com o stub para requisição gRPC e o pool de processos (None se não for utilizado)
+
+    """
+    # define variáveis para a chamada gRPC que será feita para o TF Serving
+    grpc_config = (
+        config_model["MODEL_URL_GRPC"],
+        (
+            (
+                "grpc.max_receive_message_length",
+                config_model["GRPC_MAX_RECEIVE_MESSAGE_LENGTH"],
+            ),
+            ("grpc_max_send_message_length", config_model["GRPC_MAX_SEND_MESSAGE_LENGTH"]),
+        ),
+    )
+
+    if _process_resources["pid"] != os.getpid():
+        _process_resources["process_pool"] = (
+            SharedMemoryPool(process_pool_workers) if process_pool_workers > 0 else None
+        )
+        _process_resources["grpc_config"] = None
+        _process_resources["pid"] = os.getpid()
+
+    if _process_resources["grpc_config"] != grpc_config:
+        url, options = grpc_config
+        channel = grpc.insecure_channel(url, options=list(options))
+
+        _process_resources["stub"] = prediction_service_pb2_grpc.PredictionServiceStub(
+            channel
+        )
+        _process_resources["grpc_config"] = grpc_config
+
+    return _process_resources["stub"], _process_resources["process_pool"]
+
+
+@router.on_event("shutdown")
+def shutdown():
+    # encerra o pool de processos do worker
+    if _process_resources["process_pool"] is not None:
+        _process_resources["process_pool"].shutdown()
 
 
 @router.get("/")
 async def root():
-    return config_api["NAME_API"]
+    return config_store.get().config_api["NAME_API"]
 
 
 @router.get("/healthcheck")
@@ -55,6 +112,19 @@ async def healthcheck():
     return {"status": "ok"}
 
 
+@router.get("/config_version")
+async def config_version():
+    """Retorna a versão das configurações em uso
+
+    Returns:
+        O hash do conteúdo dos arquivos de configurações e do label map e o timestamp do carregamento
+
+    """
+    config = config_store.get()
+
+    return {"version": config.version, "loaded_at": config.loaded_at}
+
+
 @router.post("/coordenadas", status_code=200)
 async def post(images_file: List[UploadFile] = File(...)):
     """Detecta objetos e retorna as coordenadas
@@ -70,12 +140,15 @@ async def post(images_file: List[UploadFile] = File(...)):
     # define o output
     output = Estimator.Output.OUTPUT_BOXES
 
+    # recupera a versão atual das configurações. A requisição utiliza essa versão até o fim
+    config = config_store.get()
+
     # coleta as informações do output
-    output_coordenadas = config_output["OUTPUTS"].get(output.value, None)
+    output_coordenadas = config.config_output["OUTPUTS"].get(output.value, None)
 
     # executa a predição nas imagens informando o output de coordenadas
     coordenadas = await execute(
-        images_file, output=output, vars_output=output_coordenadas
+        images_file, output=output, vars_output=output_coordenadas, config=config
     )
 
     return coordenadas
@@ -98,11 +171,16 @@ async def post(images_file: List[UploadFile] = File(...)):
     # define o output
     output = Estimator.Output.OUTPUT_CROPS
 
+    # recupera a versão atual das configurações. A requisição utiliza essa versão até o fim
+    config = config_store.get()
+
     # coleta as informações do output
-    output_crop = config_output["OUTPUTS"].get(output.value, None)
+    output_crop = config.config_output["OUTPUTS"].get(output.value, None)
 
     # executa a predição nas imagens informando o output crop
-    images = await execute(images_file, output=output, vars_output=output_crop)
+    images = await execute(
+        images_file, output=output, vars_output=output_crop, config=config
+    )
 
     # lida com a não detecção de nenhum objeto com um erro
     if images is None:
@@ -127,24 +205,30 @@ async def post(images_file: UploadFile = File(...)):
     # define o output
     output = Estimator.Output.OUTPUT_VIS_OBJECTS
 
+    # recupera a versão atual das configurações. A requisição utiliza essa versão até o fim
+    config = config_store.get()
+
     # coleta as informações do output
-    output_vis_objects = config_output["OUTPUTS"].get(output.value, None)
+    output_vis_objects = config.config_output["OUTPUTS"].get(output.value, None)
 
     # executa a predição na imagem informando o output de visualização dos objetos. A imagem é colocada dentro de uma
     # lista pois a função execute espera uma lista
-    image = await execute([images_file], output=output, vars_output=output_vis_objects)
+    image = await execute(
+        [images_file], output=output, vars_output=output_vis_objects, config=config
+    )
 
     # O StreamingResponse é utilizado para retornar a imagem já codificada em jpg
     return StreamingResponse(io.BytesIO(image), media_type="image/jpg")
 
 
-async def execute(images_file, output, vars_output):
+async def execute(images_file, output, vars_output, config):
     """Detecta objetos e retorna o output esperado
 
     Args:
         images_file: lista de arquivos de imagens para o detector procurar objetos
         output: o output que o detector deve retornar
         vars_output: dicionário com informações do output que o detector deve retornar
+        config: versão das configurações utilizada na requisição
 
     Returns:
         O output passado para o detector
@@ -155,16 +239,23 @@ async def execute(images_file, output, vars_output):
         await ImageProcessor.read_imagefile(image_file) for image_file in images_file
     ]
 
-    # instancia o estimador que será utilizado passando o stub para requisição gRPC, o label map e um objeto de pré-processamento de imagens
+    # recupera o stub e o pool de processos do worker atual
+    stub, process_pool = get_process_resources(config.config_model)
+
+    # instancia o estimador que será utilizado passando o stub para requisição gRPC, o label map, um objeto de
+    # pré-processamento de imagens e o pool de processos
     estimator = Estimator(
         stub=stub,
-        label_map=label_map,
+        label_map=config.label_map,
         image_processor=ImageProcessor,
+        process_pool=process_pool,
     )
 
     # utiliza o método predict do estimador (não é o método padrão para modelos TF/Keras) passando as imagens, o output
     # esperado e algumas variáveis importantes
-    response_object = estimator.predict(images, output=output, vars_output=vars_output)
+    response_object = await estimator.predict(
+        images, output=output, vars_output=vars_output
+    )
 
     # O formato do response_object varia conforme o output passado
     return response_object
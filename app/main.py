@@ -3,6 +3,14 @@
 Ao carregar a API, esse arquivo é executado carregando e configurando a API
 """
 
+import signal
+
+# o SIGHUP recarrega as configurações, mas o handler só é registrado ao importar o router, depois do Tensorflow.
+# Iniciando pelo serve.py, o sinal já chega bloqueado e fica pendente até o router desbloqueá-lo. Iniciando o uvicorn
+# diretamente, o sinal é ignorado a partir daqui para não encerrar o processo que ainda está iniciando
+if hasattr(signal, "SIGHUP") and signal.SIGHUP not in signal.pthread_sigmask(signal.SIG_BLOCK, []):
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
 from fastapi import FastAPI
 from api import router
 import os
@@ -0,0 +1,51 @@
+"""Inicialização do servidor
+
+Inicia o uvicorn com a quantidade de workers definida nas configurações da API. Com "auto", a quantidade de workers é
+calculada pela cota de CPU do container
+
+Deve ser executado a partir do diretório que contém o pacote app: python -m app.serve
+"""
+
+import json
+import multiprocessing
+import os
+import signal
+import threading
+
+import uvicorn
+
+from utils.workers import workers_count
+
+
+def forward_signals():
+    # espera o SIGHUP bloqueado e repassa para os workers
+    while True:
+        signum = signal.sigwait({signal.SIGHUP})
+        for worker in multiprocessing.active_children():
+            os.kill(worker.pid, signum)
+
+
+if __name__ == "__main__":
+    # carrega as configurações do servidor
+    config = json.load(open(os.environ.get("config_api")))
+    config_server = config.get("SERVER", {})
+
+    workers = workers_count(config_server.get("WORKERS", "auto"))
+
+    # o sinal SIGHUP recarrega as configurações. Ele é bloqueado antes de iniciar os workers, que herdam a máscara de
+    # sinais, e cada worker só o desbloqueia depois de registrar o handler (api/router.py). Assim um SIGHUP recebido
+    # enquanto o worker inicia fica pendente em vez de encerrá-lo
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGHUP})
+
+    # com vários workers, o processo principal repassa o sinal para eles. Com um único worker, a API roda no próprio
+    # processo e recebe o sinal diretamente
+    if workers > 1:
+        threading.Thread(target=forward_signals, daemon=True).start()
+
+    # inicia o servidor. Cada worker é um processo que importa a API e cria os próprios canais gRPC
+    uvicorn.run(
+        "app.main:app",
+        host=config_server.get("HOST", "0.0.0.0"),
+        port=config_server.get("PORT", 80),
+        workers=workers,
+    )
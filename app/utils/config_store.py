@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import NamedTuple
+
+from .read_label_map import LabelMap
+
+
+logger = logging.getLogger(__name__)
+
+# chaves obrigatórias de cada arquivo de configurações e os seus tipos
+REQUIRED_KEYS = {
+    "config_model": {
+        "MODEL_URL_GRPC": str,
+        "GRPC_MAX_SEND_MESSAGE_LENGTH": int,
+        "GRPC_MAX_RECEIVE_MESSAGE_LENGTH": int,
+        "LABEL_MAP_PATH": str,
+    },
+    "config_output": {"OUTPUTS": dict},
+    "config_api": {"NAME_API": str},
+}
+
+
+def validate_config(name: str, config) -> None:
+    '''Valida as chaves obrigatórias de um arquivo de configurações
+
+    Args:
+        name: nome do arquivo de configurações (chave de REQUIRED_KEYS)
+        config: conteúdo do arquivo já decodificado
+
+    Raises:
+        ValueError: Um erro ocorre se o conteúdo não for um objeto ou se faltar alguma chave ou o tipo estiver errado
+    '''
+
+    if not isinstance(config, dict):
+        raise ValueError(f"{name}: as configurações devem ser um objeto")
+
+    for key, key_type in REQUIRED_KEYS[name].items():
+        if key not in config:
+            raise ValueError(f"{name}: chave {key} não encontrada")
+        if not isinstance(config[key], key_type):
+            raise ValueError(f"{name}: chave {key} deve ser do tipo {key_type.__name__}")
+
+    # cada output deve ter as suas informações num objeto
+    if name == "config_output":
+        for output, vars_output in config["OUTPUTS"].items():
+            if not isinstance(vars_output, dict):
+                raise ValueError(f"{name}: o output {output} deve ser um objeto")
+
+
+class ConfigSnapshot(NamedTuple):
+    """Versão carregada das configurações e do mapeamento de rótulos
+
+    Attributes:
+        version: hash do conteúdo dos arquivos carregados
+        loaded_at: timestamp do carregamento
+        config_model: configurações do modelo
+        config_output: configurações dos outputs
+        config_api: configurações da API
+        label_map: mapeamento de rótulos indexado pelo id
+
+    """
+
+    version: str
+    loaded_at: float
+    config_model: dict
+    config_output: dict
+    config_api: dict
+    label_map: LabelMap
+
+
+class ConfigStore:
+    """Armazena as configurações e recarrega quando os arquivos mudam
+
+    As configurações são recarregadas quando a data de modificação de algum arquivo muda (verificada no máximo uma vez
+    a cada check_interval segundos) ou quando um recarregamento é solicitado (ex: pelo sinal SIGHUP). A nova versão só
+    substitui a atual depois de carregada por completo, então as requisições em andamento continuam com a versão que
+    receberam. Se o carregamento falhar, a versão atual é mantida
+
+    Attributes:
+        config_model_path: caminho do arquivo de configurações do modelo
+        config_output_path: caminho do arquivo de configurações dos outputs
+        config_api_path: caminho do arquivo de configurações da API
+        check_interval: intervalo mínimo em segundos entre as verificações dos arquivos
+
+    """
+
+    def __init__(self, config_model_path, config_output_path, config_api_path, check_interval=5.0):
+        self.config_model_path = config_model_path
+        self.config_output_path = config_output_path
+        self.config_api_path = config_api_path
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._reload_requested = False
+        self._last_check = time.monotonic()
+
+        # o primeiro carregamento deve funcionar, senão a API não sobe
+        self._snapshot, self._mtimes = self._load()
+
+    def _load(self):
+        """Carrega todos os arquivos e monta uma nova versão
+
+        Returns:
+            Uma tupla com a nova versão e as datas de modificação dos arquivos carregados
+        """
+
+        digest = hashlib.sha256()
+        contents = {}
+
+        # as datas de modificação são coletadas antes da leitura. Se um arquivo mudar durante o carregamento, a data
+        # registrada fica desatualizada e a mudança é carregada na próxima verificação
+        paths = (
+            ("config_model", self.config_model_path),
+            ("config_output", self.config_output_path),
+            ("config_api", self.config_api_path),
+        )
+        mtimes = self._mtimes_of([path for _, path in paths])
+
+        for name, path in paths:
+            with open(path, "rb") as file:
+                content = file.read()
+            digest.update(content)
+            contents[name] = json.loads(content)
+
+            # uma configuração incompleta não pode substituir a versão atual
+            validate_config(name, contents[name])
+
+        # o label map é interpretado a partir do mesmo conteúdo usado na versão
+        label_map_path = contents["config_model"]["LABEL_MAP_PATH"]
+        mtimes.update(self._mtimes_of([label_map_path]))
+        with open(label_map_path, "rb") as file:
+            content = file.read()
+        digest.update(content)
+        label_map = LabelMap.from_text(content.decode("utf-8"))
+
+        snapshot = ConfigSnapshot(
+            version=digest.hexdigest()[:12],
+            loaded_at=time.time(),
+            label_map=label_map,
+            **contents,
+        )
+
+        return snapshot, mtimes
+
+    @staticmethod
+    def _mtimes_of(paths):
+        mtimes = {}
+        for path in paths:
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    def request_reload(self):
+        # somente marca o pedido. É seguro chamar a partir de um handler de sinal
+        self._reload_requested = True
+
+    def reload(self):
+        """Recarrega as configurações
+
+        Returns:
+            A versão atual após o recarregamento
+        """
+
+        with self._lock:
+            self._reload_requested = False
+
+            # datas de modificação coletadas antes da tentativa, para que uma mudança durante a tentativa não se perca
+            mtimes_before = self._mtimes_of(self._mtimes)
+
+            try:
+                snapshot, mtimes = self._load()
+            except Exception as error:
+                # qualquer falha mantém a versão atual e não chega às requisições
+                logger.error(
+                    "Falha ao recarregar as configurações, mantendo a versão %s: %s",
+                    self._snapshot.version,
+                    error,
+                )
+                # evita novas tentativas até que algum arquivo mude novamente
+                self._mtimes = mtimes_before
+                return self._snapshot
+
+            if snapshot.version != self._snapshot.version:
+                logger.info(
+                    "Configurações recarregadas: versão %s -> %s",
+                    self._snapshot.version,
+                    snapshot.version,
+                )
+                self._snapshot = snapshot
+            self._mtimes = mtimes
+
+            return self._snapshot
+
+    def get(self):
+        """Recupera a versão atual das configurações, recarregando se necessário
+
+        Returns:
+            A versão atual das configurações
+        """
+
+        if self._reload_requested:
+            return self.reload()
+
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            if self._mtimes_of(self._mtimes) != self._mtimes:
+                return self.reload()
+
+        return self._snapshot
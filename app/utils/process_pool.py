@@ -0,0 +1,274 @@
+import asyncio
+import multiprocessing
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+
+def _decode_worker(input_image):
+    """Decodifica a imagem num processo do pool
+
+    A imagem decodificada é escrita num bloco de memória compartilhada para não ser serializada no retorno
+
+    Args:
+        input_image: imagem em bytes (jpeg)
+
+    Returns:
+        Uma tupla com o nome do bloco de memória compartilhada, o shape e o dtype da imagem
+    """
+
+    # decodifica com o opencv já na ordem de canais BGR, ignorando a orientação do EXIF como o TF Serving
+    image = cv2.imdecode(
+        np.frombuffer(input_image, np.uint8),
+        cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION,
+    )
+    if image is None:
+        raise ValueError("Não foi possível decodificar a imagem")
+
+    # cria o bloco de memória compartilhada e copia a imagem para ele
+    shm = shared_memory.SharedMemory(create=True, size=image.nbytes)
+    shared_image = np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)
+    np.copyto(shared_image, image)
+
+    shape, dtype = image.shape, image.dtype.str
+
+    # o bloco continua existindo após o close. Quem remove o bloco é o processo principal
+    del shared_image
+    shm.close()
+
+    return shm.name, shape, dtype
+
+
+def _encode_worker(name, shape, dtype, strides, offset, extension):
+    """Codifica a imagem que está na memória compartilhada num processo do pool
+
+    Args:
+        name: nome do bloco de memória compartilhada
+        shape: shape da imagem
+        dtype: dtype da imagem
+        strides: strides da imagem no bloco (None para uma imagem contínua)
+        offset: posição em bytes do início da imagem no bloco
+        extension: extensão da codificação (ex: ".jpg")
+
+    Returns:
+        A imagem codificada em bytes
+    """
+
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        image = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset, strides=strides)
+        _, encoded = cv2.imencode(extension, image)
+        del image
+    finally:
+        shm.close()
+
+    return encoded.tobytes()
+
+
+def _close_block(blocks, key, shm):
+    """Fecha e remove o bloco de uma imagem decodificada quando não há mais referências para ela"""
+
+    blocks.pop(key, None)
+    shm.close()
+    shm.unlink()
+
+
+def _discard_block(future):
+    """Remove o bloco criado por uma decodificação cujo resultado não será utilizado"""
+
+    if future.cancelled() or future.exception() is not None:
+        return
+
+    shm = shared_memory.SharedMemory(name=future.result()[0])
+    shm.close()
+    shm.unlink()
+
+
+async def _wait_all(futures):
+    """Espera todas as tarefas do pool sem bloquear o event loop
+
+    Args:
+        futures: lista de futures do pool de processos
+
+    Returns:
+        Uma lista com o resultado ou a exceção de cada tarefa
+    """
+
+    return await asyncio.gather(
+        *(asyncio.wrap_future(future) for future in futures), return_exceptions=True
+    )
+
+
+class SharedMemoryPool:
+    """Pool de processos para decodificação e codificação de imagens
+
+    As imagens trafegam entre o processo principal e o pool por blocos de memória compartilhada, evitando a
+    serialização dos arrays. O pool é criado com "spawn" para não herdar o estado do processo principal
+    (canais gRPC, threads do Tensorflow)
+
+    As imagens decodificadas são retornadas como arrays sobre os blocos de memória compartilhada, sem cópia. O bloco de
+    cada imagem é fechado e removido quando não houver mais referências para a imagem nem para visões dela (recortes,
+    por exemplo). Ao codificar uma imagem decodificada pelo pool, ou uma visão dela, o bloco existente é reutilizado
+
+    Attributes:
+        max_workers: quantidade de processos do pool
+        executor: executor do pool de processos
+
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+        # blocos das imagens decodificadas ainda em uso: id da imagem -> (referência fraca da imagem, nome do bloco)
+        self._blocks = {}
+
+    def _attach(self, name, shape, dtype):
+        """Abre o bloco de uma imagem decodificada e monta o array sobre ele
+
+        O bloco fica vinculado ao array: as visões do array mantêm o array vivo e, quando ele é coletado, o bloco é
+        fechado e removido. Fechar o bloco antes disso deixaria as visões apontando para memória desmapeada
+        """
+
+        shm = shared_memory.SharedMemory(name=name)
+        image = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+        self._blocks[id(image)] = (weakref.ref(image), name)
+        weakref.finalize(image, _close_block, self._blocks, id(image), shm)
+
+        return image
+
+    def _find_block(self, image):
+        """Procura o bloco de memória compartilhada que contém a imagem
+
+        Args:
+            image: imagem decodificada pelo pool ou uma visão dela
+
+        Returns:
+            Uma tupla com o nome do bloco e a posição em bytes da imagem no bloco, ou None se a imagem não estiver num
+            bloco do pool
+        """
+
+        # as visões de um array mantêm o array original como base
+        base = image
+        while isinstance(base, np.ndarray):
+            entry = self._blocks.get(id(base))
+            if entry is not None and entry[0]() is base:
+                offset = image.__array_interface__["data"][0] - base.__array_interface__["data"][0]
+                return entry[1], offset
+            base = base.base
+
+        return None
+
+    async def decode(self, images):
+        """Decodifica as imagens no pool
+
+        Args:
+            images: lista de imagens em bytes
+
+        Returns:
+            Uma lista de imagens decodificadas como array numpy (BGR), em memória compartilhada
+        """
+
+        # as imagens são decodificadas em paralelo. Todas as tarefas terminam antes de continuar para que os blocos
+        # compartilhados criados sejam removidos mesmo que alguma imagem falhe
+        futures = [self.executor.submit(_decode_worker, image) for image in images]
+        try:
+            results = await _wait_all(futures)
+        except asyncio.CancelledError:
+            # com a requisição cancelada, os blocos são removidos quando as tarefas em andamento terminarem
+            for future in futures:
+                future.add_done_callback(_discard_block)
+            raise
+
+        errors = [result for result in results if isinstance(result, BaseException)]
+
+        # com falha em alguma imagem, os blocos das demais são removidos e o erro é repassado
+        if errors:
+            for result in results:
+                if not isinstance(result, BaseException):
+                    shm = shared_memory.SharedMemory(name=result[0])
+                    shm.close()
+                    shm.unlink()
+            raise errors[0]
+
+        return [self._attach(name, shape, dtype) for name, shape, dtype in results]
+
+    async def encode(self, images, extension=".jpg"):
+        """Codifica as imagens no pool
+
+        Args:
+            images: lista de imagens como array numpy, já na ordem de canais do opencv (BGR)
+            extension: extensão da codificação
+
+        Returns:
+            Uma lista de imagens codificadas em bytes
+        """
+
+        # as imagens que já estão num bloco do pool são enviadas pelo nome do bloco, sem cópia. As demais são copiadas
+        # para um bloco novo
+        blocks = []
+        futures = []
+        try:
+            for image in images:
+                block = self._find_block(image)
+
+                if block is not None:
+                    name, offset = block
+                    strides = image.strides
+                else:
+                    shm = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+                    blocks.append(shm)
+
+                    shared_image = np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)
+                    np.copyto(shared_image, image)
+                    del shared_image
+
+                    name, offset, strides = shm.name, 0, None
+
+                futures.append(
+                    self.executor.submit(
+                        _encode_worker,
+                        name,
+                        image.shape,
+                        image.dtype.str,
+                        strides,
+                        offset,
+                        extension,
+                    )
+                )
+
+            # as imagens passadas continuam referenciadas até aqui, então os seus blocos não são removidos antes de
+            # as tarefas terminarem
+            results = await _wait_all(futures)
+        finally:
+            # os blocos novos podem ser removidos mesmo com tarefas em andamento, pois o processo do pool mantém o seu
+            # próprio mapeamento da memória
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        return results
+
+    def release(self, images):
+        """Libera as imagens decodificadas
+
+        A lista é esvaziada. O bloco de cada imagem é fechado quando não houver mais nenhuma referência para ela
+
+        Args:
+            images: lista de imagens retornada pelo decode
+        """
+
+        images.clear()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
@@ -1,42 +1,212 @@
+import re
+
+import numpy as np
+
+
+# tokens do formato texto do protobuf: comentários, strings entre aspas, delimitadores e valores
+_TOKEN_RE = re.compile(
+    r"""\s*(?:(\#[^\n]*)|("(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'|[{}:;,<>\[\]]|[^\s{}:;,<>\[\]"'\#]+))"""
+)
+
+
+def _tokenize(text: str) -> list:
+    '''Separa o conteúdo do arquivo em tokens, ignorando os comentários
+
+    Raises:
+        ValueError: Um erro ocorre se existir um trecho que não pode ser separado em tokens
+    '''
+
+    tokens = []
+    position = 0
+    text = text.rstrip()
+
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Label map inválido na posição {position}")
+
+        position = match.end()
+        if match.group(2) is not None:
+            tokens.append(match.group(2))
+
+    return tokens
+
+
+def _parse_message(tokens: list, position: int, closing: str = None) -> tuple:
+    '''Lê os campos de uma mensagem no formato texto do protobuf
+
+    Args:
+        tokens: lista de tokens
+        position: posição do primeiro token da mensagem
+        closing: token que fecha a mensagem ("}" ou ">"), ou None para a mensagem raiz
+
+    Returns:
+        Uma tupla com a lista de campos (nome, valor) e a posição do próximo token. Mensagens aninhadas são listas de
+        campos
+
+    Raises:
+        ValueError: Um erro ocorre se a mensagem não estiver bem formada
+    '''
+
+    fields = []
+
+    while position < len(tokens):
+        token = tokens[position]
+
+        if token == closing:
+            return fields, position + 1
+        if token in ";,":
+            position += 1
+            continue
+
+        # nome do campo seguido opcionalmente de ":"
+        name = token
+        position += 1
+        if position < len(tokens) and tokens[position] == ":":
+            position += 1
+        if position >= len(tokens):
+            raise ValueError(f"Label map inválido: campo '{name}' sem valor")
+
+        value = tokens[position]
+        if value in ("{", "<"):
+            # mensagem aninhada
+            value, position = _parse_message(
+                tokens, position + 1, "}" if value == "{" else ">"
+            )
+        elif value in "}>:;,[]":
+            raise ValueError(f"Label map inválido: valor inesperado '{value}' no campo '{name}'")
+        else:
+            position += 1
+
+        fields.append((name, value))
+
+    if closing is not None:
+        raise ValueError(f"Label map inválido: '{closing}' não encontrado")
+
+    return fields, position
+
+
+def _unquote(value: str) -> str:
+    # remove as aspas e trata os caracteres de escape
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1].encode("latin-1", "backslashreplace").decode("unicode_escape")
+    return value
+
+
 def read_label_map(label_map_path: str) -> dict:
     '''Lê o arquivo com o mapeamento de rótulos
 
-    O mapeamento deve estar no protobuf format
+    O mapeamento deve estar no protobuf format (StringIntLabelMap)
 
     Args:
         label_map_path: uma string com o caminho para o arquivo com o mapeamento de rótulos
 
+    Returns:
+        items: um dicionário contendo o id do objeto como chave e o nome do objeto como valor. É utilizado o
+        display_name e, se não existir, o name
+
+    Raises:
+        ValueError: Um erro ocorre se o arquivo não estiver no formato esperado
+    '''
+
+    with open(label_map_path, "r") as file:
+        return parse_label_map(file.read())
+
+
+def parse_label_map(text: str) -> dict:
+    '''Interpreta o conteúdo de um mapeamento de rótulos
+
+    Args:
+        text: conteúdo do mapeamento de rótulos no protobuf format (StringIntLabelMap)
+
     Returns:
         items: um dicionário contendo o id do objeto como chave e o nome do objeto como valor
 
     Raises:
-        Sem raises
+        ValueError: Um erro ocorre se o conteúdo não estiver no formato esperado
     '''
 
-    # inicializa as variáveis
-    item_id = None
-    item_name = None
+    fields, _ = _parse_message(_tokenize(text), 0)
+
     items = {}
 
-    with open(label_map_path, "r") as file:
-        for line in file:
-            # procura linhas que contenham o ID e o display_name do objeto
-            line.replace(" ", "")
-            if line == "item{":
-                pass
-            elif line == "}":
-                pass
-            elif "id" in line:
-                item_id = int(line.split(":", 1)[1])
-            elif "display_name" in line:
-                item_name = line.split(":", 1)[1].replace("\"", "").strip()
-
-            # verifica se já é possível incluir um novo objeto no dicionário de items
-            if item_id is not None and item_name is not None:
-                items[item_id] = item_name
-
-                # reinicializa as variáveis
-                item_id = None
-                item_name = None
+    for field_name, item in fields:
+        # somente os campos item interessam
+        if field_name != "item":
+            continue
+        if not isinstance(item, list):
+            raise ValueError("Label map inválido: item deve ser uma mensagem")
+
+        values = {key: value for key, value in item if not isinstance(value, list)}
+        if "id" not in values:
+            raise ValueError("Label map inválido: item sem id")
+
+        item_id = int(values["id"])
+        item_name = _unquote(values.get("display_name", values.get("name", "")))
+
+        # sem nome, o id é utilizado como rótulo
+        items[item_id] = item_name if item_name else str(item_id)
 
     return items
+
+
+class LabelMap:
+    """Mapeamento de rótulos indexado pelo id
+
+    Os nomes ficam num array em que a posição é o id do objeto, permitindo a consulta de vários ids de uma vez
+
+    Attributes:
+        items: dicionário com o id do objeto como chave e o nome do objeto como valor
+        index: array com o nome do objeto na posição do seu id (None para os ids sem rótulo)
+
+    """
+
+    def __init__(self, items):
+        self.items = dict(items)
+
+        # monta o índice com o tamanho do maior id
+        size = max((item_id for item_id in self.items if item_id >= 0), default=-1) + 1
+        self.index = np.full(size, None, dtype=object)
+        for item_id, item_name in self.items.items():
+            if item_id >= 0:
+                self.index[item_id] = item_name
+
+    @classmethod
+    def from_file(cls, label_map_path):
+        return cls(read_label_map(label_map_path))
+
+    @classmethod
+    def from_text(cls, text):
+        return cls(parse_label_map(text))
+
+    def get(self, class_id, default=None):
+        # mesma interface do dicionário de rótulos
+        return self.items.get(int(class_id), default)
+
+    def names(self, class_ids):
+        """Consulta os nomes de vários ids
+
+        Args:
+            class_ids: lista ou array de ids
+
+        Returns:
+            Um array com o nome de cada id. Os ids sem rótulo são mantidos
+        """
+
+        class_ids = np.asarray(class_ids, dtype=np.int64)
+
+        # ids fora do índice são consultados na posição 0 e descartados em seguida
+        known = (class_ids >= 0) & (class_ids < len(self.index))
+        if len(self.index) > 0:
+            names = np.where(known, self.index[np.where(known, class_ids, 0)], None)
+        else:
+            names = np.full(class_ids.shape, None, dtype=object)
+
+        # os ids sem rótulo são mantidos como o próprio id
+        missing = np.equal(names, None)
+        names[missing] = class_ids[missing]
+
+        return names
+
+    def __len__(self):
+        return len(self.items)
@@ -0,0 +1,93 @@
+import math
+import os
+from typing import Optional
+
+
+# arquivos do cgroup que definem a cota de CPU do container (v2 e v1, respectivamente)
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def cpu_quota() -> Optional[float]:
+    '''Lê a cota de CPU do container
+
+    Procura a cota definida no cgroup v2 e, se não encontrar, no cgroup v1
+
+    Args:
+        Sem argumentos
+
+    Returns:
+        A quantidade de CPUs disponíveis pela cota (ex: 0.4 para um limit de 400m) ou None se não houver cota
+
+    Raises:
+        Sem raises
+    '''
+
+    # cgroup v2: o arquivo contém "<quota> <period>" ou "max <period>" quando não há limite
+    try:
+        with open(CGROUP_V2_CPU_MAX, "r") as file:
+            quota, period = file.read().split()[:2]
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1: a cota é -1 quando não há limite
+    try:
+        with open(CGROUP_V1_CPU_QUOTA, "r") as file:
+            quota = int(file.read())
+        with open(CGROUP_V1_CPU_PERIOD, "r") as file:
+            period = int(file.read())
+        if quota <= 0 or period <= 0:
+            return None
+        return quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> int:
+    '''Quantidade de CPUs que o processo pode utilizar
+
+    Considera a afinidade do processo e a cota de CPU do container
+
+    Args:
+        Sem argumentos
+
+    Returns:
+        A quantidade de CPUs, sempre maior ou igual a 1
+    '''
+
+    # CPUs visíveis para o processo (a afinidade pode ser menor que o total da máquina)
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # a cota do container limita o uso mesmo que existam mais CPUs visíveis. Uma cota fracionada (ex: 1.5) é
+    # arredondada para cima para aproveitar a parte fracionada
+    quota = cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+
+    return max(1, cpus)
+
+
+def workers_count(workers="auto") -> int:
+    '''Define a quantidade de workers do servidor
+
+    Args:
+        workers: quantidade de workers ou "auto" para calcular pela quantidade de CPUs disponíveis
+
+    Returns:
+        A quantidade de workers, sempre maior ou igual a 1
+
+    Raises:
+        ValueError: Um erro ocorre se o valor não for "auto" nem um inteiro
+    '''
+
+    if workers is None or workers == "auto":
+        return available_cpus()
+
+    return max(1, int(workers))
@@ -0,0 +1,122 @@
+"""Benchmark de memória por requisição
+
+Mede o pico de memória alocada pelo processamento de uma requisição para cada output: decodificação da imagem, montagem
+da requisição gRPC, pós-processamento das detecções e construção do output. O TF Serving é substituído por um stub que
+retorna detecções fixas, então o benchmark não depende do modelo
+
+Execução (a partir da pasta tests): PYTHONPATH=../app python benchmark_memory.py
+
+O pico é medido com o tracemalloc, que contabiliza os arrays numpy e os objetos Python. As alocações internas do
+protobuf e do Tensorflow não são contabilizadas; o maxrss do processo é exibido ao final como referência
+"""
+
+import asyncio
+import os
+import resource
+import tracemalloc
+
+from tensorflow.core.framework import types_pb2
+from tensorflow_serving.apis import predict_pb2
+
+from api.imageprocessor import ImageProcessor
+from api.estimators.objectdetector import ObjectDetector
+from utils.read_label_map import LabelMap
+
+
+IMAGE_PATH = os.path.join(os.path.dirname(__file__), "files", "00011.jpg")
+ITERATIONS = 20
+
+
+class FakeStub:
+    """Stub que substitui o TF Serving retornando as mesmas detecções para cada imagem"""
+
+    def __init__(self, boxes, scores, classes):
+        self.boxes = boxes
+        self.scores = scores
+        self.classes = classes
+
+    def _tensor(self, response, key, values, dims):
+        tensor = response.outputs[key]
+        tensor.dtype = types_pb2.DT_FLOAT
+        for size in dims:
+            tensor.tensor_shape.dim.add(size=size)
+        tensor.float_val.extend(values)
+
+    def Predict(self, request, timeout):
+        num_images = request.inputs["input_tensor"].tensor_shape.dim[0].size
+        num_detections = len(self.scores)
+
+        response = predict_pb2.PredictResponse()
+        self._tensor(
+            response,
+            "detection_boxes",
+            [value for box in self.boxes for value in box] * num_images,
+            [num_images, num_detections, 4],
+        )
+        self._tensor(
+            response, "detection_scores", self.scores * num_images, [num_images, num_detections]
+        )
+        self._tensor(
+            response, "detection_classes", self.classes * num_images, [num_images, num_detections]
+        )
+        self._tensor(response, "num_detections", [num_detections] * num_images, [num_images])
+
+        return response
+
+
+def measure(output, vars_output, images):
+    """Executa a predição e retorna o pico de memória alocada em bytes"""
+
+    estimator = ObjectDetector(
+        stub=FakeStub(
+            boxes=[[0.40, 0.30, 0.55, 0.60], [0.10, 0.10, 0.20, 0.25]],
+            scores=[0.95, 0.75],
+            classes=[1.0, 1.0],
+        ),
+        label_map=LabelMap({1: "license_plate"}),
+        image_processor=ImageProcessor,
+    )
+
+    tracemalloc.reset_peak()
+    start, _ = tracemalloc.get_traced_memory()
+
+    asyncio.run(estimator.predict(list(images), output=output, vars_output=vars_output))
+
+    _, peak = tracemalloc.get_traced_memory()
+
+    return peak - start
+
+
+if __name__ == "__main__":
+    with open(IMAGE_PATH, "rb") as file:
+        image = file.read()
+
+    height, width = ImageProcessor.decode_image(image).shape[:2]
+    print(f"imagem: {os.path.basename(IMAGE_PATH)} ({len(image) / 1024:.1f} KiB jpeg, {width}x{height})")
+
+    outputs = {
+        ObjectDetector.Output.OUTPUT_BOXES: {"max_objects": 5, "confidence_threshold": 0.2},
+        ObjectDetector.Output.OUTPUT_CROPS: {"max_objects": 10, "confidence_threshold": 0.4},
+        ObjectDetector.Output.OUTPUT_VIS_OBJECTS: {
+            "max_objects": 5,
+            "confidence_threshold": 0.2,
+            "show_confidence": True,
+        },
+    }
+
+    # a primeira execução inicializa o Tensorflow e não entra na medição
+    measure(ObjectDetector.Output.OUTPUT_BOXES, outputs[ObjectDetector.Output.OUTPUT_BOXES], [image])
+
+    tracemalloc.start()
+
+    for output, vars_output in outputs.items():
+        for num_images in (1, 4):
+            peaks = [measure(output, vars_output, [image] * num_images) for _ in range(ITERATIONS)]
+            print(
+                f"{output.value:<20} imagens={num_images}  pico por requisição: "
+                f"{max(peaks) / 1024 / 1024:.2f} MiB"
+            )
+
+    tracemalloc.stop()
+
+    print(f"maxrss do processo: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
@@ -0,0 +1,136 @@
+"""Benchmark de throughput por quantidade de workers
+
+Para cada quantidade de workers, inicia a API com python -m app.serve, executa o Locust com a mesma carga e grava os
+CSVs do Locust em workers_<n>_*.csv. Ao final exibe uma tabela com o throughput de cada quantidade de workers
+
+O TF Serving deve estar acessível pelo MODEL_URL_GRPC do config_model e as variáveis de ambiente config_model,
+config_output e config_api devem estar definidas
+
+Execução (a partir da pasta tests): python benchmark_workers.py --workers 1 2 4
+"""
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(TESTS_DIR)
+
+
+def wait_healthcheck(url, timeout, server):
+    """Espera a API responder o healthcheck
+
+    Raises:
+        RuntimeError: Um erro ocorre se o processo da API terminar antes de responder
+        TimeoutError: Um erro ocorre se a API não responder dentro do timeout
+    """
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"A API terminou com o código {server.returncode} antes de responder")
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(1)
+
+    raise TimeoutError(f"A API não respondeu em {url}")
+
+
+def run(workers, args, config_api):
+    """Executa o benchmark para uma quantidade de workers
+
+    Returns:
+        Um dicionário com as métricas agregadas do Locust
+    """
+
+    # grava um config_api temporário com a quantidade de workers e a porta do benchmark
+    config = dict(config_api)
+    config["SERVER"] = dict(config.get("SERVER", {}), WORKERS=workers, PORT=args.port)
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+        json.dump(config, file)
+
+    # a API é iniciada a partir da raiz do repositório, então os caminhos do PYTHONPATH herdado são convertidos para
+    # absolutos e a pasta app é incluída, como no container
+    python_path = [os.path.join(ROOT_DIR, "app")] + [
+        os.path.abspath(path) for path in os.environ.get("PYTHONPATH", "").split(os.pathsep) if path
+    ]
+    env = dict(
+        os.environ,
+        config_model=os.path.abspath(os.environ["config_model"]),
+        config_output=os.path.abspath(os.environ["config_output"]),
+        config_api=file.name,
+        PYTHONPATH=os.pathsep.join(python_path),
+    )
+    prefix = config["CHAMADAS_API"]["0"]["prefix"]
+    host = f"http://localhost:{args.port}"
+
+    server = subprocess.Popen([sys.executable, "-m", "app.serve"], cwd=ROOT_DIR, env=env)
+    try:
+        wait_healthcheck(f"{host}{prefix}/healthcheck", args.startup_timeout, server)
+
+        csv_prefix = f"workers_{workers}"
+        subprocess.run(
+            [
+                "locust",
+                "-f",
+                "locustfile.py",
+                "--headless",
+                "-u",
+                str(args.users),
+                "-r",
+                str(args.spawn_rate),
+                "-t",
+                args.duration,
+                "--csv",
+                csv_prefix,
+            ],
+            cwd=TESTS_DIR,
+            env=dict(env, LOCUST_API_HOST=host, LOCUST_API_PATH=f"{prefix}/{args.output}"),
+            check=True,
+        )
+    finally:
+        server.terminate()
+        server.wait()
+        os.remove(file.name)
+
+    # a linha "Aggregated" contém as métricas de todas as requisições
+    with open(os.path.join(TESTS_DIR, f"{csv_prefix}_stats.csv")) as file:
+        for row in csv.DictReader(file):
+            if row["Name"] == "Aggregated":
+                return row
+
+    return {}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--spawn-rate", type=int, default=10)
+    parser.add_argument("--duration", default="2m")
+    parser.add_argument("--port", type=int, default=8401)
+    parser.add_argument("--output", default="crop", choices=["coordenadas", "crop", "vis_objects"])
+    parser.add_argument("--startup-timeout", type=int, default=120)
+    args = parser.parse_args()
+
+    config_api = json.load(open(os.environ.get("config_api")))
+
+    results = {workers: run(workers, args, config_api) for workers in args.workers}
+
+    print(f"\n{'workers':>8} {'req/s':>10} {'falhas/s':>10} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for workers, row in results.items():
+        print(
+            f"{workers:>8} {float(row.get('Requests/s', 0)):>10.2f} {float(row.get('Failures/s', 0)):>10.2f} "
+            f"{row.get('50%', '-'):>10} {row.get('95%', '-'):>10}"
+        )
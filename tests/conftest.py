@@ -0,0 +1,5 @@
+import os
+import sys
+
+# os módulos da API são importados a partir da pasta app, como no container (PYTHONPATH=/app)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
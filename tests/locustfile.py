@@ -3,7 +3,7 @@ import os
 
 
 class LoadTest(HttpUser):
-    host = "http://localhost"
+    host = os.environ.get("LOCUST_API_HOST", "http://localhost:8401")
 
     @task
     def predict_placa_veiculo(self):
@@ -12,6 +12,6 @@ class LoadTest(HttpUser):
         with open(os.path.join("files", image_path), "rb") as image:
             data = [("images_file", image)]
 
-            url = "http://localhost:8401/detect_license_plate/crop"
+            url = os.environ.get("LOCUST_API_PATH", "/detect_license_plate/crop")
 
             self.client.request("POST", url, files=data)
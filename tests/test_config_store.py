@@ -0,0 +1,139 @@
+import json
+import os
+
+import pytest
+
+from utils import config_store as config_store_module
+from utils.config_store import ConfigStore
+
+
+@pytest.fixture
+def config_files(tmp_path):
+    label_map_path = tmp_path / "label_map.pbtxt"
+    label_map_path.write_text('item { id: 1 display_name: "license_plate" }')
+
+    paths = {
+        "config_model": tmp_path / "config_model.json",
+        "config_output": tmp_path / "config_output.json",
+        "config_api": tmp_path / "config_api.json",
+    }
+    paths["config_model"].write_text(
+        json.dumps(
+            {
+                "MODEL_URL_GRPC": "model-service:8500",
+                "GRPC_MAX_SEND_MESSAGE_LENGTH": 3840000,
+                "GRPC_MAX_RECEIVE_MESSAGE_LENGTH": 384000000,
+                "LABEL_MAP_PATH": str(label_map_path),
+            }
+        )
+    )
+    paths["config_output"].write_text(
+        json.dumps({"OUTPUTS": {"OUTPUT_BOXES": {"confidence_threshold": 0.2}}})
+    )
+    paths["config_api"].write_text(json.dumps({"NAME_API": "Detector"}))
+    paths["label_map"] = label_map_path
+
+    return paths
+
+
+def make_store(paths, check_interval=0):
+    return ConfigStore(
+        str(paths["config_model"]),
+        str(paths["config_output"]),
+        str(paths["config_api"]),
+        check_interval=check_interval,
+    )
+
+
+def rewrite(path, content):
+    # garante que a data de modificação mude mesmo em sistemas de arquivos com pouca resolução
+    mtime = os.stat(path).st_mtime_ns
+    path.write_text(content)
+    os.utime(path, ns=(mtime + 1_000_000_000, mtime + 1_000_000_000))
+
+
+def test_reload_on_mtime_change(config_files):
+    store = make_store(config_files)
+    first = store.get()
+
+    rewrite(
+        config_files["label_map"],
+        'item { id: 1 display_name: "license_plate" }\nitem { id: 2 display_name: "car" }',
+    )
+    second = store.get()
+
+    assert second.version != first.version
+    assert second.label_map.items == {1: "license_plate", 2: "car"}
+    # a versão anterior continua íntegra para as requisições em andamento
+    assert first.label_map.items == {1: "license_plate"}
+
+
+def test_no_reload_before_interval(config_files):
+    store = make_store(config_files, check_interval=3600)
+    first = store.get()
+
+    rewrite(config_files["config_api"], json.dumps({"NAME_API": "Outro"}))
+
+    assert store.get() is first
+
+
+@pytest.mark.parametrize(
+    "name, content",
+    [
+        ("config_model", "{"),
+        ("config_model", "[]"),
+        ("config_model", json.dumps({"LABEL_MAP_PATH": "x"})),
+        ("config_output", json.dumps({"SAIDAS": {}})),
+        ("config_output", json.dumps({"OUTPUTS": {"OUTPUT_BOXES": 1}})),
+        ("config_api", json.dumps({"NAME_API": 1})),
+        ("label_map", "item { id: }"),
+    ],
+)
+def test_failed_reload_keeps_version(config_files, name, content):
+    store = make_store(config_files)
+    first = store.get()
+
+    rewrite(config_files[name], content)
+
+    assert store.get() is first
+    # sem nova modificação dos arquivos, não há nova tentativa
+    assert store.get() is first
+
+
+def test_request_reload(config_files):
+    store = make_store(config_files, check_interval=3600)
+    first = store.get()
+
+    rewrite(config_files["config_api"], json.dumps({"NAME_API": "Outro"}))
+    store.request_reload()
+    second = store.get()
+
+    assert second.version != first.version
+    assert second.config_api["NAME_API"] == "Outro"
+    assert store._reload_requested is False
+
+
+def test_change_during_load_is_reloaded(config_files, monkeypatch):
+    store = make_store(config_files)
+    first = store.get()
+
+    # o label map muda enquanto a versão nova é carregada, depois de lido
+    from_text = config_store_module.LabelMap.from_text
+
+    def from_text_and_rewrite(text):
+        label_map = from_text(text)
+        monkeypatch.setattr(config_store_module.LabelMap, "from_text", from_text)
+        rewrite(config_files["label_map"], 'item { id: 3 display_name: "truck" }')
+        return label_map
+
+    rewrite(config_files["label_map"], 'item { id: 2 display_name: "car" }')
+    monkeypatch.setattr(config_store_module.LabelMap, "from_text", from_text_and_rewrite)
+    second = store.get()
+
+    assert second.version != first.version
+    assert second.label_map.items == {2: "car"}
+
+    # a mudança feita durante o carregamento é percebida na próxima verificação
+    third = store.get()
+
+    assert third.label_map.items == {3: "truck"}
@@ -0,0 +1,118 @@
+import asyncio
+import gc
+import os
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from utils.process_pool import SharedMemoryPool
+
+
+IMAGE_PATH = os.path.join(os.path.dirname(__file__), "files", "00011.jpg")
+SHM_DIR = "/dev/shm"
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = SharedMemoryPool(max_workers=2)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture(scope="module")
+def image_bytes():
+    with open(IMAGE_PATH, "rb") as file:
+        return file.read()
+
+
+def shm_blocks():
+    # blocos de memória compartilhada existentes (os semáforos do multiprocessing são ignorados)
+    if not os.path.isdir(SHM_DIR):
+        return set()
+    return {name for name in os.listdir(SHM_DIR) if not name.startswith("sem.")}
+
+
+def test_decode(pool, image_bytes):
+    images = asyncio.run(pool.decode([image_bytes, image_bytes]))
+
+    expected = cv2.imdecode(
+        np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+    )
+    assert len(images) == 2
+    for image in images:
+        assert image.shape == expected.shape
+        assert np.array_equal(image, expected)
+
+    pool.release(images)
+
+
+def test_release_keeps_referenced_images(pool, image_bytes):
+    images = asyncio.run(pool.decode([image_bytes]))
+    image = images[0]
+    crop = image[10:20, 30:50]
+    expected = int(crop.sum())
+
+    pool.release(images)
+    del image
+    gc.collect()
+
+    # o recorte ainda referencia a imagem, então o bloco continua mapeado
+    assert images == []
+    assert int(crop.sum()) == expected
+
+
+def test_blocks_removed_without_references(pool, image_bytes):
+    before = shm_blocks()
+
+    images = asyncio.run(pool.decode([image_bytes]))
+    crop = images[0][10:20, 30:50]
+    assert len(shm_blocks() - before) == 1
+
+    pool.release(images)
+    gc.collect()
+    assert len(shm_blocks() - before) == 1
+
+    del crop
+    gc.collect()
+    assert shm_blocks() - before == set()
+    assert pool._blocks == {}
+
+
+def test_encode_view_reuses_block(pool, image_bytes):
+    images = asyncio.run(pool.decode([image_bytes]))
+    crop = images[0][10:60, 20:120]
+    before = shm_blocks()
+
+    encoded = asyncio.run(pool.encode([crop, images[0]], extension=".png"))
+
+    # nenhum bloco novo é criado para imagens que já estão num bloco do pool
+    assert shm_blocks() == before
+    assert np.array_equal(cv2.imdecode(np.frombuffer(encoded[0], np.uint8), cv2.IMREAD_COLOR), crop)
+    assert np.array_equal(
+        cv2.imdecode(np.frombuffer(encoded[1], np.uint8), cv2.IMREAD_COLOR), images[0]
+    )
+
+    pool.release(images)
+
+
+def test_encode_array(pool):
+    image = np.arange(40 * 30 * 3, dtype=np.uint8).reshape(40, 30, 3)
+    before = shm_blocks()
+
+    encoded = asyncio.run(pool.encode([image], extension=".png"))
+
+    assert np.array_equal(cv2.imdecode(np.frombuffer(encoded[0], np.uint8), cv2.IMREAD_COLOR), image)
+    assert shm_blocks() == before
+
+
+def test_decode_corrupt_image(pool, image_bytes):
+    before = shm_blocks()
+
+    with pytest.raises(ValueError):
+        asyncio.run(pool.decode([image_bytes, b"not an image"]))
+
+    # o bloco da imagem válida é removido
+    assert shm_blocks() == before
+    assert pool._blocks == {}
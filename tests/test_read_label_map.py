@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from utils.read_label_map import LabelMap, parse_label_map, read_label_map
+
+
+LABEL_MAP_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "files", "label_map.pbtxt"
+)
+
+
+def write_label_map(tmp_path, content):
+    path = tmp_path / "label_map.pbtxt"
+    path.write_text(content)
+    return str(path)
+
+
+def test_read_label_map_original_file():
+    assert read_label_map(LABEL_MAP_PATH) == {1: "license_plate"}
+
+
+def test_read_label_map_comments_and_nested_messages(tmp_path):
+    path = write_label_map(
+        tmp_path,
+        """
+        # id: 9 display_name: "comentario"
+        item {
+          id: 1  # comentário no fim da linha
+          display_name: "license_plate"
+          keypoints { id: 7 label: "canto" }
+        }
+        item < id: 2 display_name: 'car' >
+        """,
+    )
+
+    assert read_label_map(path) == {1: "license_plate", 2: "car"}
+
+
+def test_read_label_map_name_fallback(tmp_path):
+    path = write_label_map(tmp_path, 'item { name: "truck" id: 3 }\nitem { id: 4 }')
+
+    assert read_label_map(path) == {3: "truck", 4: "4"}
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        'item { id: 1 display_name: "car"',
+        "item { id: }",
+        'item { display_name: "car" }',
+        "item: 1",
+        'item { id: 1 display_name: "car }',
+    ],
+)
+def test_read_label_map_malformed(tmp_path, content):
+    with pytest.raises(ValueError):
+        read_label_map(write_label_map(tmp_path, content))
+
+
+def test_label_map_names():
+    label_map = LabelMap({1: "license_plate", 3: "car"})
+
+    names = label_map.names([1, 3, 2, 10, -1])
+
+    assert list(names) == ["license_plate", "car", 2, 10, -1]
+
+
+def test_label_map_names_empty():
+    assert list(LabelMap({}).names([1, -1])) == [1, -1]
+
+
+def test_label_map_get():
+    label_map = LabelMap({1: "license_plate"})
+
+    assert label_map.get(1.0) == "license_plate"
+    assert label_map.get(5, 5) == 5
+
+
+def test_label_map_from_text():
+    text = 'item { id: 1 display_name: "license_plate" }'
+
+    assert parse_label_map(text) == {1: "license_plate"}
+    assert LabelMap.from_text(text).items == {1: "license_plate"}
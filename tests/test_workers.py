@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from utils import workers
+
+
+@pytest.fixture
+def cgroup(tmp_path, monkeypatch):
+    """Aponta os arquivos do cgroup para uma pasta temporária, inicialmente sem nenhum arquivo"""
+
+    paths = {
+        "v2": tmp_path / "cpu.max",
+        "v1_quota": tmp_path / "cpu.cfs_quota_us",
+        "v1_period": tmp_path / "cpu.cfs_period_us",
+    }
+    monkeypatch.setattr(workers, "CGROUP_V2_CPU_MAX", str(paths["v2"]))
+    monkeypatch.setattr(workers, "CGROUP_V1_CPU_QUOTA", str(paths["v1_quota"]))
+    monkeypatch.setattr(workers, "CGROUP_V1_CPU_PERIOD", str(paths["v1_period"]))
+
+    # a máquina do teste é vista com 8 CPUs
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+
+    return paths
+
+
+def test_cpu_quota_v2(cgroup):
+    cgroup["v2"].write_text("150000 100000\n")
+
+    assert workers.cpu_quota() == 1.5
+
+
+def test_cpu_quota_v2_max(cgroup):
+    cgroup["v2"].write_text("max 100000\n")
+
+    assert workers.cpu_quota() is None
+
+
+def test_cpu_quota_v1(cgroup):
+    cgroup["v1_quota"].write_text("40000\n")
+    cgroup["v1_period"].write_text("100000\n")
+
+    assert workers.cpu_quota() == 0.4
+
+
+def test_cpu_quota_v1_unlimited(cgroup):
+    cgroup["v1_quota"].write_text("-1\n")
+    cgroup["v1_period"].write_text("100000\n")
+
+    assert workers.cpu_quota() is None
+
+
+def test_cpu_quota_invalid_v2_falls_back_to_v1(cgroup):
+    cgroup["v2"].write_text("invalido\n")
+    cgroup["v1_quota"].write_text("200000\n")
+    cgroup["v1_period"].write_text("100000\n")
+
+    assert workers.cpu_quota() == 2.0
+
+
+def test_cpu_quota_without_cgroup(cgroup):
+    assert workers.cpu_quota() is None
+
+
+@pytest.mark.parametrize(
+    "cpu_max, expected",
+    [
+        (None, 8),
+        ("max 100000", 8),
+        ("40000 100000", 1),
+        ("150000 100000", 2),
+        ("400000 100000", 4),
+        ("1600000 100000", 8),
+    ],
+)
+def test_available_cpus(cgroup, cpu_max, expected):
+    if cpu_max is not None:
+        cgroup["v2"].write_text(cpu_max)
+
+    assert workers.available_cpus() == expected
+
+
+def test_workers_count(cgroup):
+    cgroup["v2"].write_text("250000 100000")
+
+    assert workers.workers_count("auto") == 3
+    assert workers.workers_count(None) == 3
+    assert workers.workers_count(2) == 2
+    assert workers.workers_count("4") == 4
+    assert workers.workers_count(0) == 1
+
+
+def test_workers_count_invalid(cgroup):
+    with pytest.raises(ValueError):
+        workers.workers_count("muitos")